@@ -1,53 +1,137 @@
-from flask import Flask, render_template, request, redirect, send_file
+from flask import Flask, render_template, request, redirect, send_file, jsonify, url_for, abort, Response
+import io
 import os
-import shutil
-from your_script import ImageRenamerThread  # Import your processing logic
+import zipfile
+from werkzeug.utils import secure_filename
+from jobs import JobManager, QueueFullError
+from renamer_core import ImageRenamer
+from exporters import site_names
+from zip_transfer import stream_renamed_archive
+from model_registry import registry
+from metrics import default_metrics
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = '/home/site/wwwroot/uploads/'
-app.config['PROCESSED_FOLDER'] = '/home/site/wwwroot/processed/'
+app.config['JOBS_FOLDER'] = os.environ.get('PIXELPURE_JOBS_FOLDER', '/home/site/wwwroot/jobs/')
+app.config['JOB_WORKERS'] = int(os.environ.get('PIXELPURE_JOB_WORKERS', '2'))
 
+# Load BLIP and BART once at startup so the first request doesn't pay for it
+if os.environ.get('PIXELPURE_WARMUP', '0') == '1':
+    registry.warm_up()
 
-def clean_directory(directory):
-    """Helper function to delete all files in a directory."""
-    for filename in os.listdir(directory):
-        file_path = os.path.join(directory, filename)
-        try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
-                os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                shutil.rmtree(file_path)
-        except Exception as e:
-            print(f'Failed to delete {file_path}. Reason: {e}')
+# Uploads are processed in the background, each job in its own directory
+job_manager = JobManager(app.config['JOBS_FOLDER'], max_workers=app.config['JOB_WORKERS'])
+
+
+def create_job_from_request():
+    """Saves the uploaded files into a new job's directory and queues it."""
+    files = request.files.getlist('file')
+    stock_site = get_stock_site()
+
+    try:
+        job = job_manager.create_job(stock_site)
+    except QueueFullError:
+        abort(503, description="Too many jobs are waiting, please try again later.")
+
+    # Save uploaded files; a job whose uploads can't all be saved is dropped again
+    try:
+        for file in files:
+            if file and secure_filename(file.filename):
+                file.save(os.path.join(job.upload_folder, secure_filename(file.filename)))
+    except Exception:
+        job_manager.discard(job)
+        raise
+
+    job_manager.submit(job)
+    return job
+
+
+def get_stock_site():
+    stock_site = request.form.get('stock_site')
+    if stock_site not in site_names():
+        abort(400, description="Unknown stock site.")
+    return stock_site
+
+
+def get_job_or_404(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        abort(404)
+    return job
 
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        files = request.files.getlist('file')
-        stock_site = request.form.get('stock_site')
+        job = create_job_from_request()
+        return redirect(url_for('job_page', job_id=job.id))
+
+    return render_template('index.html', stock_sites=site_names())
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    job = create_job_from_request()
+    response = job.to_dict()
+    response['status_url'] = url_for('job_status', job_id=job.id)
+    response['download_url'] = url_for('job_download', job_id=job.id)
+    return jsonify(response), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    return jsonify(get_job_or_404(job_id).to_dict())
+
+
+@app.route('/jobs/<job_id>/view')
+def job_page(job_id):
+    return render_template('job.html', job=get_job_or_404(job_id))
+
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    job = get_job_or_404(job_id)
+    if job.status != 'finished':
+        return jsonify(job.to_dict()), 409
+
+    # Provide the CSV file for download
+    return send_file(job.csv_filename, as_attachment=True)
 
-        # Save uploaded files
-        for file in files:
-            if file:
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-                file.save(file_path)
 
-        # Process the uploaded images
-        renamer = ImageRenamerThread(app.config['UPLOAD_FOLDER'], app.config['PROCESSED_FOLDER'], stock_site)
-        renamer.run()
+@app.route('/zip', methods=['POST'])
+def process_zip():
+    """Takes a zip of images and streams back a zip of the renamed images plus the site CSV."""
+    stock_site = get_stock_site()
+    upload = request.files.get('archive')
+    if upload is None or not zipfile.is_zipfile(upload.stream):
+        abort(400, description="Please upload a zip archive.")
+    upload.stream.seek(0)
 
-        # Generate the CSV
-        csv_file = renamer.save_csv([], app.config['PROCESSED_FOLDER'], len(files))
+    # Zip uploads are processed while the response streams, in one of the job manager's slots
+    if not job_manager.slots.acquire(blocking=False):
+        abort(503, description="Too many archives are being processed, please try again later.")
 
-        # Clean up: Delete the uploaded and processed images
-        clean_directory(app.config['UPLOAD_FOLDER'])
-        clean_directory(app.config['PROCESSED_FOLDER'])
+    # Take the uploaded file over from the request, which closes its files before the response streams
+    archive_file = upload.stream
+    upload.stream = io.BytesIO()
+    try:
+        renamer = ImageRenamer(None, None, stock_site, **job_manager.renamer_options)
+        archive_name = os.path.splitext(secure_filename(upload.filename or '') or 'images')[0]
+        download_name = f"{renamer.csv_site_name()}_{archive_name}.zip"
+        response = Response(stream_renamed_archive(renamer, archive_file), mimetype='application/zip',
+                            headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+    except Exception:
+        archive_file.close()
+        job_manager.slots.release()
+        raise
+    response.call_on_close(archive_file.close)
+    response.call_on_close(job_manager.slots.release)
+    return response
 
-        # Provide the CSV file for download
-        return send_file(csv_file, as_attachment=True)
 
-    return render_template('index.html')
+@app.route('/metrics')
+def metrics():
+    """Process-wide pipeline metrics in the Prometheus text format."""
+    return Response(default_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
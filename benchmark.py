@@ -0,0 +1,220 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from PIL import Image
+from image_decode import decode_image
+from model_registry import ModelRegistry
+from renamer_core import ImageRenamer
+
+FORMATS = {
+    "jpg": "JPEG",
+    "png": "PNG",
+    "gif": "GIF",
+    "bmp": "BMP",
+}
+
+
+class StubCaptioner:
+    """Stands in for BLIP: returns a fixed-shape caption after an optional per-image delay."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def caption(self, images):
+        time.sleep(self.latency * len(images))
+        return [f"a photo of a {image.width} by {image.height} landscape with people and animals"
+                for image in images]
+
+
+class StubParaphraser:
+    """Stands in for BART: echoes each text with a short suffix after an optional per-text delay."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def paraphrase(self, texts, **generate_kwargs):
+        texts = list(texts)
+        time.sleep(self.latency * len(texts))
+        return [f"{text} on a sunny day in the city" for text in texts]
+
+
+def stub_registry(caption_latency=0.0, paraphrase_latency=0.0):
+    return ModelRegistry({
+        "captioner": lambda: StubCaptioner(caption_latency),
+        "paraphraser": lambda: StubParaphraser(paraphrase_latency),
+    })
+
+
+def offline_registry():
+    """The real BLIP/BART registry, restricted to models already in the local Hugging Face cache."""
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    return ModelRegistry()
+
+
+def generate_images(folder, count, width, height, image_format, seed=0):
+    """Writes count synthetic photos to folder; noise keeps them as costly to decode as real ones."""
+    os.makedirs(folder, exist_ok=True)
+    extension = image_format
+    # Render one noise tile and vary it per image so generation stays fast
+    base = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    for index in range(count):
+        image = Image.blend(base, Image.new("RGB", (width, height), ((seed + index * 37) % 256, 128, 64)), 0.3)
+        if FORMATS[image_format] == "GIF":
+            image = image.convert("P")
+        image.save(os.path.join(folder, f"synthetic_{index:06d}.{extension}"), FORMATS[image_format])
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def time(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+        return result
+
+
+def benchmark_stages(source_folder, work_folder, renamer_options):
+    """Runs each pipeline stage on its own, serially, and returns seconds per stage."""
+    input_folder = os.path.join(work_folder, "stages_input")
+    output_folder = os.path.join(work_folder, "stages_output")
+    shutil.copytree(source_folder, input_folder)
+    os.makedirs(output_folder)
+
+    renamer = ImageRenamer(input_folder, output_folder, "Adobe Stock", cache=False, **renamer_options)
+    captioner = renamer.registry.get_captioner()
+    renamer.registry.get_paraphraser()
+    timer = StageTimer()
+
+    file_paths = timer.time("scan", renamer.scan_input)
+
+    def decode(paths):
+        images = []
+        for file_path in paths:
+            with open(file_path, 'rb') as f:
+                images.append(decode_image(io.BytesIO(f.read()), renamer.decode_size, renamer.max_decode_bytes))
+        return images
+
+    records = []
+    for start in range(0, len(file_paths), renamer.batch_size):
+        batch = file_paths[start:start + renamer.batch_size]
+        images = timer.time("decode", decode, batch)
+        captions = timer.time("caption", captioner.caption, images)
+        titles = timer.time("text", renamer.text_engine.sanitize_titles, captions)
+        final_titles = timer.time("paraphrase", renamer.paraphrase_texts, titles)
+        details = timer.time("keywords", renamer.text_engine.describe_titles, final_titles)
+        records.extend(dict(detail, title=title) for detail, title in zip(details, final_titles))
+
+    def rename(paths):
+        date_str = datetime.now().strftime("%Y%m%d")
+        rows = []
+        for number, (file_path, record) in enumerate(zip(paths, records), start=1):
+            new_filename = renamer.get_incremental_filename(date_str, number) + os.path.splitext(file_path)[1]
+            os.rename(file_path, os.path.join(output_folder, new_filename))
+            rows.append(renamer.build_row(new_filename, record))
+        return rows
+
+    rows = timer.time("rename", rename, file_paths)
+    timer.time("csv", renamer.save_csv, rows, output_folder, len(rows))
+    return timer.stages
+
+
+def benchmark_end_to_end(source_folder, work_folder, renamer_options):
+    """Times a complete ImageRenamer.run(), with all stages overlapping as in production."""
+    input_folder = os.path.join(work_folder, "run_input")
+    output_folder = os.path.join(work_folder, "run_output")
+    shutil.copytree(source_folder, input_folder)
+    os.makedirs(output_folder)
+
+    renamer = ImageRenamer(input_folder, output_folder, "Adobe Stock", cache=False, **renamer_options)
+    renamer.registry.warm_up()
+    start = time.perf_counter()
+    renamer.run()
+    return time.perf_counter() - start
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the image renaming pipeline.")
+    parser.add_argument("--count", type=int, default=100, help="number of synthetic images")
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--format", default="jpg", choices=sorted(FORMATS))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--decode-workers", type=int, default=4)
+    parser.add_argument("--caption-latency", type=float, default=0.0,
+                        help="simulated stub captioner seconds per image")
+    parser.add_argument("--paraphrase-latency", type=float, default=0.0,
+                        help="simulated stub paraphraser seconds per title")
+    parser.add_argument("--real-models", action="store_true",
+                        help="use the real BLIP/BART models (must already be in the local cache)")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    if args.real_models:
+        registry = offline_registry()
+    else:
+        registry = stub_registry(args.caption_latency, args.paraphrase_latency)
+    renamer_options = {
+        "registry": registry,
+        "batch_size": args.batch_size,
+        "decode_workers": args.decode_workers,
+    }
+
+    work_folder = tempfile.mkdtemp(prefix="pixelpure_bench_")
+    try:
+        source_folder = os.path.join(work_folder, "source")
+        generate_images(source_folder, args.count, args.width, args.height, args.format)
+
+        stages = benchmark_stages(source_folder, work_folder, renamer_options)
+        end_to_end = benchmark_end_to_end(source_folder, work_folder, renamer_options)
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "stages": {
+            name: {"seconds": round(seconds, 6), "ms_per_image": round(seconds * 1000 / args.count, 3)}
+            for name, seconds in stages.items()
+        },
+        "end_to_end": {
+            "seconds": round(end_to_end, 6),
+            "images_per_second": round(args.count / end_to_end, 3) if end_to_end else None,
+        },
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, stage in results["stages"].items():
+        print(f"{name:>10}: {stage['seconds']:9.3f}s  {stage['ms_per_image']:8.2f} ms/image")
+    print(f"{'run()':>10}: {results['end_to_end']['seconds']:9.3f}s  "
+          f"{results['end_to_end']['images_per_second']:8.2f} images/s")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "PIXELPURE_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "pixelpure", "captions.sqlite3")
+)
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class CaptionCache:
+    """Persistent LRU cache of generated metadata, keyed on image content.
+
+    Entries are stored in SQLite under sha256(config_version + image bytes), so a
+    re-uploaded file is recognized regardless of its name and a model or config
+    change invalidates every older entry.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS captions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS captions_last_used ON captions (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+
+    @staticmethod
+    def make_key(image_bytes, config_version):
+        """Returns the cache key for the given image bytes and model/config version."""
+        digest = hashlib.sha256(config_version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the cached metadata dict for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM captions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE captions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """Stores the metadata dict for key, evicting the least recently used entries if full."""
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM captions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO captions (key, value, last_used) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+            if exists is None:
+                self._count += 1
+            if self.max_entries and self._count > self.max_entries:
+                # Evict down to 90% so we don't pay for a delete on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM captions WHERE key IN "
+                    "(SELECT key FROM captions ORDER BY last_used ASC LIMIT ?)",
+                    (excess,)
+                )
+                self._count -= excess
+            self._conn.commit()
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM captions")
+            self._conn.commit()
+            self._count = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Returns the process-wide cache stored at DEFAULT_CACHE_PATH."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CaptionCache()
+        return _default_cache
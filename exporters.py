@@ -0,0 +1,120 @@
+import os
+import csv
+import shutil
+from datetime import datetime
+
+
+class SiteExporter:
+    """Turns image records into one stock agency's filenames and CSV rows.
+
+    A record is what ImageRenamer.describe_loaded produces: the caption, the final
+    title, the keywords and the categories the text engine picked for the built-in
+    sites. Subclasses set the class attributes and implement build_row; an agency with
+    its own category scheme can map record["keywords"] in build_row. Register new
+    exporters with register_exporter() to make them selectable by name.
+    """
+
+    # Name the site is selected by, as shown in the UI
+    name = None
+    # Used in CSV and journal filenames, and as the folder name when exported alongside another site
+    csv_name = None
+    # Renamed files are called <filename_prefix>_<date>_<number><extension>
+    filename_prefix = None
+    columns = []
+
+    def filename(self, date_str, number):
+        return f"{self.filename_prefix}_{date_str}_{number}"
+
+    def build_row(self, filename, record):
+        raise NotImplementedError
+
+    def default_csv_name(self, total_photos):
+        now = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{self.csv_name}_{total_photos}Photos_{now}.csv"
+
+    def partial_csv_name(self):
+        """Name of a CSV whose run is still going and so has no photo count yet."""
+        now = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{self.csv_name}_InProgress_{now}.csv"
+
+    def write_csv(self, data, csvfile):
+        """Writes the header and rows to an open text file."""
+        writer = csv.DictWriter(csvfile, fieldnames=self.columns)
+        writer.writeheader()
+        for row in data:
+            filtered_row = {k: v for k, v in row.items() if k in self.columns}
+            writer.writerow(filtered_row)
+
+
+class AdobeStockExporter(SiteExporter):
+    name = "Adobe Stock"
+    csv_name = "AdobeStock"
+    filename_prefix = "adobe"
+    columns = ["Filename", "Title", "Keywords", "Category", "Releases"]
+
+    def build_row(self, filename, record):
+        return {
+            "Filename": filename,
+            "Title": record["title"],
+            "Keywords": ", ".join(record["keywords"]),
+            "Category": record["category"],
+            "Releases": ""
+        }
+
+
+class ShutterstockExporter(SiteExporter):
+    name = "Shutterstock"
+    csv_name = "Shutterstock"
+    filename_prefix = "shutterstock"
+    columns = ["Filename", "Description", "Keywords", "Categories", "Editorial", "Mature Content", "Illustration"]
+
+    def build_row(self, filename, record):
+        return {
+            "Filename": filename,
+            "Description": record["title"],
+            "Keywords": ", ".join(record["keywords"]),
+            "Categories": ", ".join(record["categories"]),
+            "Editorial": "no",
+            "Mature Content": "no",
+            "Illustration": "no"
+        }
+
+
+# Exporters by site name, in the order they are offered
+EXPORTERS = {}
+
+
+def register_exporter(exporter):
+    """Makes an exporter instance selectable by its name."""
+    EXPORTERS[exporter.name] = exporter
+    return exporter
+
+
+def get_exporter(name):
+    try:
+        return EXPORTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown stock site {name!r}; choose from {list(EXPORTERS)}") from None
+
+
+def site_names():
+    return list(EXPORTERS)
+
+
+def link_or_copy(source, target):
+    """Gives target the contents of source as a hard link, or as a copy where links aren't possible.
+
+    Raises FileExistsError rather than replacing an existing target.
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise
+    except OSError:
+        if os.path.exists(target):
+            raise FileExistsError(target)
+        shutil.copy2(source, target)
+
+
+register_exporter(AdobeStockExporter())
+register_exporter(ShutterstockExporter())
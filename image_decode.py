@@ -0,0 +1,49 @@
+from PIL import Image
+
+# BLIP resizes every image to 384x384, so there is no point decoding more than that
+DEFAULT_TARGET_SIZE = 384
+
+# Largest decoded image (in bytes) a worker is allowed to hold in memory at once
+DEFAULT_MAX_DECODE_BYTES = 256 * 1024 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image cannot be decoded within the per-image memory cap."""
+
+
+def decode_image(source, target_size=DEFAULT_TARGET_SIZE, max_decode_bytes=DEFAULT_MAX_DECODE_BYTES):
+    """Decodes an image to RGB at the smallest resolution whose short side is >= target_size.
+
+    JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale through Pillow's draft mode, so a
+    60 MP photo never exists in memory at full size. Other formats have to be decoded in
+    full and are then reduced by an integer factor before the RGB conversion. GIFs only
+    decode their first frame. Images whose decoded size would exceed max_decode_bytes
+    raise ImageTooLargeError instead of being loaded, as do images Pillow itself refuses to
+    open as decompression bombs (over twice Image.MAX_IMAGE_PIXELS).
+    """
+    try:
+        image = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+
+    if target_size and image.format == "JPEG":
+        # Both sides stay >= target_size; draft only picks the DCT scale, nothing is decoded yet
+        image.draft("RGB", (target_size, target_size))
+
+    width, height = image.size
+    decoded_bytes = width * height * max(len(image.getbands()), 3)
+    if max_decode_bytes and decoded_bytes > max_decode_bytes:
+        raise ImageTooLargeError(
+            f"{width}x{height} {image.mode} image needs {decoded_bytes} bytes to decode "
+            f"(limit {max_decode_bytes})"
+        )
+
+    if target_size:
+        factor = min(width, height) // target_size
+        if factor >= 2:
+            # Palette, bilevel and 16-bit images can't be reduced directly
+            if image.mode not in ("L", "LA", "RGB", "RGBA"):
+                image = image.convert("RGB")
+            image = image.reduce(factor)
+
+    return image.convert("RGB")
@@ -0,0 +1,144 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from renamer_core import ImageRenamer
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while too many jobs are already waiting."""
+
+
+class Job:
+    """One upload batch, processed in its own working directory."""
+
+    def __init__(self, job_id, stock_site, work_dir):
+        self.id = job_id
+        self.stock_site = stock_site
+        self.work_dir = work_dir
+        self.upload_folder = os.path.join(work_dir, "uploads")
+        self.processed_folder = os.path.join(work_dir, "processed")
+        self.status = "queued"
+        self.progress = 0
+        self.error = None
+        self.csv_filename = None
+        self.summary = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("finished", "failed")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "stock_site": self.stock_site,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "summary": self.summary,
+        }
+
+
+class JobManager:
+    """Runs ImageRenamer jobs on a bounded pool of background threads.
+
+    Every job gets an isolated working directory under root_folder, so concurrent
+    uploads never see (or clean up) each other's files. Finished jobs are removed
+    max_age seconds after they complete. Jobs and anything else that runs inference for
+    the web app (such as zip uploads) take one of the max_workers slots first, so there
+    are never more than max_workers of them at once.
+    """
+
+    def __init__(self, root_folder, max_workers=2, max_pending=50, max_age=3600, **renamer_options):
+        self.root_folder = root_folder
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.renamer_options = renamer_options
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pixelpure-job")
+        self.slots = threading.BoundedSemaphore(max_workers)
+        os.makedirs(root_folder, exist_ok=True)
+
+    def create_job(self, stock_site):
+        """Creates a job and its working directories; files are saved into job.upload_folder."""
+        self.cleanup()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.done)
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} jobs are already waiting")
+
+            job_id = uuid.uuid4().hex
+            job = Job(job_id, stock_site, os.path.join(self.root_folder, job_id))
+            os.makedirs(job.upload_folder)
+            os.makedirs(job.processed_folder)
+            self._jobs[job_id] = job
+        return job
+
+    def discard(self, job):
+        """Forgets a job that was never submitted, e.g. because saving its uploads failed."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def submit(self, job):
+        """Queues a job whose uploads have been saved."""
+        self._executor.submit(self._run, job)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        with self.slots:
+            self._run_job(job)
+
+    def _run_job(self, job):
+        job.status = "running"
+
+        def update_progress(value):
+            job.progress = value
+
+        try:
+            renamer = ImageRenamer(job.upload_folder, job.processed_folder, job.stock_site,
+                                   on_progress=update_progress, **self.renamer_options)
+            renamer.run()
+            job.summary = renamer.run_summary
+
+            # Only the CSV is returned, so keep it and drop the uploaded and renamed images
+            job.csv_filename = os.path.join(job.work_dir, os.path.basename(renamer.csv_filename))
+            os.replace(renamer.csv_filename, job.csv_filename)
+            shutil.rmtree(job.upload_folder, ignore_errors=True)
+            shutil.rmtree(job.processed_folder, ignore_errors=True)
+            job.progress = 100
+            job.status = "finished"
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def cleanup(self):
+        """Deletes finished jobs, and their files, older than max_age."""
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
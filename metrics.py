@@ -0,0 +1,148 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Latency histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        # Largest value seen, reported for quantiles beyond the last bucket
+        self.max = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def quantile(self, q):
+        """Estimates the q-quantile as the upper bound of the bucket it falls in.
+
+        Quantiles above the last bucket return the largest value observed, so summaries
+        stay finite and JSON-serializable.
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+
+class Metrics:
+    """Stage latency histograms and event counters for the processing pipeline.
+
+    Stages are timed with `with metrics.stage("decode"):` or observe(); events such as
+    cache hits or model loads are counted with increment(). A Metrics created with a
+    parent forwards everything to it, so a per-run instance can summarize one run
+    while the process-wide default_metrics aggregates all of them. Callables added with
+    add_hook(callback) are called as callback(kind, name, value) for every observation,
+    where kind is "stage" or "event".
+    """
+
+    def __init__(self, parent=None, buckets=DEFAULT_BUCKETS):
+        self.parent = parent
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, callback):
+        self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self._hooks.remove(callback)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        self._call_hooks("stage", stage, seconds)
+        if self.parent is not None:
+            self.parent.observe(stage, seconds)
+
+    def increment(self, event, amount=1):
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + amount
+        self._call_hooks("event", event, amount)
+        if self.parent is not None:
+            self.parent.increment(event, amount)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def _call_hooks(self, kind, name, value):
+        for hook in list(self._hooks):
+            hook(kind, name, value)
+
+    def summary(self):
+        """Returns a JSON-friendly summary: throughput, per-stage latency and event counts."""
+        with self._lock:
+            elapsed = time.time() - self.started_at
+            images = self._counters.get("images_processed", 0)
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "images": images,
+                "images_per_second": round(images / elapsed, 3) if elapsed > 0 else None,
+                "stages": {
+                    stage: {
+                        "count": histogram.count,
+                        "total_seconds": round(histogram.sum, 6),
+                        "mean_seconds": round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                        "p50_seconds": histogram.quantile(0.5),
+                        "p95_seconds": histogram.quantile(0.95),
+                    }
+                    for stage, histogram in self._histograms.items()
+                },
+                "events": dict(self._counters),
+            }
+
+    def render_prometheus(self, prefix="pixelpure"):
+        """Renders every histogram and counter in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f"# HELP {prefix}_events_total Pipeline events such as images processed and cache hits.")
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for event, count in sorted(self._counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{event}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics, exposed by the Flask app at /metrics
+default_metrics = Metrics()
@@ -0,0 +1,204 @@
+import gc
+import os
+import time
+import functools
+import threading
+from metrics import default_metrics
+
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+BART_MODEL_NAME = "facebook/bart-large-cnn"
+
+
+# "fp32" runs the models as published; "int8" applies torch dynamic quantization to
+# their Linear layers, trading a little caption quality for CPU throughput
+INFERENCE_BACKENDS = ("fp32", "int8")
+
+
+class InferenceConfig:
+    """How the captioner and paraphraser are loaded and executed."""
+
+    def __init__(self, backend="fp32", num_threads=None, compile_model=False):
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"backend must be one of {INFERENCE_BACKENDS}")
+        self.backend = backend
+        self.num_threads = num_threads
+        self.compile_model = compile_model
+
+    @classmethod
+    def from_env(cls):
+        """Reads PIXELPURE_BACKEND, PIXELPURE_TORCH_THREADS and PIXELPURE_COMPILE."""
+        num_threads = os.environ.get("PIXELPURE_TORCH_THREADS")
+        return cls(backend=os.environ.get("PIXELPURE_BACKEND", "fp32"),
+                   num_threads=int(num_threads) if num_threads else None,
+                   compile_model=os.environ.get("PIXELPURE_COMPILE", "0") == "1")
+
+    @property
+    def variant(self):
+        """Identifies settings that change model outputs (thread counts don't)."""
+        return f"{self.backend}{'+compiled' if self.compile_model else ''}"
+
+    def optimize(self, model):
+        """Applies the configured backend to a loaded torch model."""
+        import torch
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        model.eval()
+        if self.backend == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if self.compile_model:
+            # generate() calls forward() many times, so compile forward rather than the module
+            model.forward = torch.compile(model.forward, dynamic=True)
+        return model
+
+
+class Captioner:
+    """Wraps the BLIP processor and model behind a batched caption() call."""
+
+    def __init__(self, processor, model):
+        import torch
+
+        self.processor = processor
+        self.model = model
+        self._inference_mode = torch.inference_mode
+        self._lock = threading.Lock()
+
+    def caption(self, images):
+        """Generates one caption per image in a single processor/generate call."""
+        with self._lock, self._inference_mode():
+            inputs = self.processor(images=images, return_tensors="pt")
+            outputs = self.model.generate(**inputs)
+            return self.processor.batch_decode(outputs, skip_special_tokens=True)
+
+
+class Paraphraser:
+    """Wraps the BART text2text pipeline behind a batched paraphrase() call."""
+
+    def __init__(self, text_pipeline):
+        import torch
+
+        self.pipeline = text_pipeline
+        self._inference_mode = torch.inference_mode
+        self._lock = threading.Lock()
+
+    def paraphrase(self, texts, **generate_kwargs):
+        """Returns the generated text for each input text, in order."""
+        with self._lock, self._inference_mode():
+            outputs = self.pipeline(list(texts), **generate_kwargs)
+        return [output[0]['generated_text'] if isinstance(output, list) else output['generated_text']
+                for output in outputs]
+
+
+def load_captioner(config=None):
+    """Loads the BLIP image captioning model and processor."""
+    # Imported here so importing this module never pulls in transformers/torch
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+
+    config = config or InferenceConfig()
+    processor = BlipProcessor.from_pretrained(BLIP_MODEL_NAME)
+    model = config.optimize(BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME))
+    return Captioner(processor, model)
+
+
+def load_paraphraser(config=None):
+    """Loads the BART summarization pipeline used for paraphrasing titles."""
+    from transformers import pipeline
+
+    config = config or InferenceConfig()
+    text_pipeline = pipeline("text2text-generation", model=BART_MODEL_NAME)
+    text_pipeline.model = config.optimize(text_pipeline.model)
+    return Paraphraser(text_pipeline)
+
+
+def make_factories(config):
+    """Returns the captioner/paraphraser factories for an InferenceConfig."""
+    return {
+        "captioner": functools.partial(load_captioner, config),
+        "paraphraser": functools.partial(load_paraphraser, config),
+    }
+
+
+DEFAULT_FACTORIES = make_factories(InferenceConfig())
+
+
+class ModelRegistry:
+    """Thread-safe, process-wide cache of loaded models.
+
+    Each model is created by its factory on first use and then shared by every
+    caller until it is explicitly unloaded.
+    """
+
+    def __init__(self, factories=None, metrics=None, variant="fp32"):
+        self.metrics = metrics or default_metrics
+        # Part of the caption cache key, so records from different backends never mix
+        self.variant = variant
+        self._factories = dict(DEFAULT_FACTORIES if factories is None else factories)
+        self._models = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self._factories}
+
+    def get(self, name):
+        """Returns the named model, loading it on first use."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Unknown model: {name}")
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so different models can load in parallel
+        with load_lock:
+            model = self._models.get(name)
+            if model is None:
+                started = time.perf_counter()
+                model = self._factories[name]()
+                self._models[name] = model
+                self.metrics.observe(f"load_{name}", time.perf_counter() - started)
+                self.metrics.increment("model_loads")
+        return model
+
+    def get_captioner(self):
+        return self.get("captioner")
+
+    def get_paraphraser(self):
+        return self.get("paraphraser")
+
+    @classmethod
+    def from_config(cls, config, metrics=None):
+        return cls(make_factories(config), metrics=metrics, variant=config.variant)
+
+    def register(self, name, factory):
+        """Registers (or replaces) the factory for a model and drops any loaded instance."""
+        with self._lock:
+            self._factories[name] = factory
+            self._load_locks.setdefault(name, threading.Lock())
+        self.unload([name])
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """Loads the given models (all registered models by default) ahead of the first request."""
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def unload(self, names=None):
+        """Drops the given models (all loaded models by default) and frees their memory."""
+        with self._lock:
+            names = list(self._models) if names is None else names
+            load_locks = [self._load_locks.get(name) for name in names]
+
+        for name, load_lock in zip(names, load_locks):
+            if load_lock is None:
+                continue
+            with load_lock:
+                if self._models.pop(name, None) is not None:
+                    self.metrics.increment("model_unloads")
+        gc.collect()
+
+
+# Shared by the GUI thread and the Flask app
+registry = ModelRegistry.from_config(InferenceConfig.from_env())
@@ -0,0 +1,55 @@
+import os
+import re
+import json
+import threading
+
+
+class NamingIndex:
+    """Persistent next-sequence-number index for the files in one output folder.
+
+    Keys are filename stems such as "adobe_20240131". The first time a stem is used the
+    output folder is scanned once for the highest existing number; after that numbers
+    are handed out from the index file in O(1), so repeated runs on the same day carry
+    on where the last one stopped instead of colliding with its files.
+    """
+
+    FILENAME = ".pixelpure_names.json"
+
+    def __init__(self, output_folder):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, self.FILENAME)
+        self._lock = threading.Lock()
+        self._next = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._next = json.load(f)
+            except ValueError:
+                # A corrupt index is rebuilt from the folder on demand
+                self._next = {}
+
+    def reserve(self, stem):
+        """Returns the next free sequence number for stem and records it as used."""
+        with self._lock:
+            number = self._next.get(stem)
+            if number is None:
+                number = self._highest_existing(stem) + 1
+            self._next[stem] = number + 1
+            self._save()
+            return number
+
+    def _highest_existing(self, stem):
+        pattern = re.compile(re.escape(stem) + r'_(\d+)(\.|$)')
+        highest = 0
+        with os.scandir(self.output_folder) as entries:
+            for entry in entries:
+                match = pattern.match(entry.name)
+                if match:
+                    highest = max(highest, int(match.group(1)))
+        return highest
+
+    def _save(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(self._next, f)
+        os.replace(temporary_path, self.path)
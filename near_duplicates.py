@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from PIL import Image
+
+HASH_BITS = 64
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash: whether each pixel of a tiny grayscale copy is brighter than its right neighbour.
+
+    Robust to the exposure, white balance and small framing changes between burst and
+    bracketed frames, and cheap on the already downscaled images BLIP is fed.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """Finds a stored hash within max_distance bits of a query without comparing against every entry.
+
+    Multi-index hashing: the 64 bits are split into max_distance + 1 bands, so by the
+    pigeonhole principle any hash within max_distance of a stored one matches it exactly
+    in at least one band. Each band is a dict from band value to entry ids, and only
+    those candidates are checked bit by bit. The index keeps the most recent max_entries
+    hashes, which is plenty for bursts since near-duplicates arrive next to each other.
+    """
+
+    def __init__(self, max_distance=6, max_entries=1024):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance must be between 0 and {HASH_BITS - 1}")
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        band_count = max_distance + 1
+        # (shift, mask) per band; the first HASH_BITS % band_count bands get one extra bit
+        self._bands = []
+        start = 0
+        for band in range(band_count):
+            width = HASH_BITS // band_count + (1 if band < HASH_BITS % band_count else 0)
+            self._bands.append((start, (1 << width) - 1))
+            start += width
+        self._buckets = [{} for _ in self._bands]
+        self._entries = OrderedDict()
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_values(self, value):
+        return [(value >> shift) & mask for shift, mask in self._bands]
+
+    def find(self, value):
+        """Returns the payload of the closest stored hash within max_distance, or None."""
+        candidates = set()
+        for buckets, band_value in zip(self._buckets, self._band_values(value)):
+            candidates.update(buckets.get(band_value, ()))
+
+        best, best_distance = None, self.max_distance + 1
+        for entry_id in candidates:
+            stored, payload = self._entries[entry_id]
+            distance = hamming_distance(value, stored)
+            if distance < best_distance:
+                best, best_distance = payload, distance
+        return best
+
+    def add(self, value, payload):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (value, payload)
+        for buckets, band_value in zip(self._buckets, self._band_values(value)):
+            buckets.setdefault(band_value, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            old_id, (old_value, _) = self._entries.popitem(last=False)
+            for buckets, band_value in zip(self._buckets, self._band_values(old_value)):
+                bucket = buckets[band_value]
+                bucket.discard(old_id)
+                if not bucket:
+                    del buckets[band_value]
+
+    def clear(self):
+        self._buckets = [{} for _ in self._bands]
+        self._entries.clear()
+
+
+class DuplicateGroup:
+    """A group leader's place in the index; its record is filled in once the leader is described."""
+
+    def __init__(self):
+        self.record = None
+        self.members = 0
+        self._titles = None
+
+    def member_record(self, text_engine):
+        """Returns the leader's record varied for the next member.
+
+        Each member takes the next of the title's rewordings from text_engine (cycling
+        back to the leader's own title once they run out) and rotates the keywords, so
+        every frame gets a different leading set, which is what the agencies weigh most.
+        The categories are reused as they are since the keywords don't change.
+        """
+        if self._titles is None:
+            self._titles = [self.record["title"]] + text_engine.title_variants(self.record["title"])
+        self.members += 1
+        keywords = self.record["keywords"]
+        shift = self.members % len(keywords) if keywords else 0
+        return dict(self.record, title=self._titles[self.members % len(self._titles)],
+                    keywords=keywords[shift:] + keywords[:shift])
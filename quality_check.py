@@ -0,0 +1,122 @@
+import os
+import io
+import json
+import time
+import random
+import difflib
+import argparse
+from image_decode import decode_image
+from model_registry import ModelRegistry, InferenceConfig, INFERENCE_BACKENDS
+from renamer_core import ImageRenamer
+
+
+def load_sample(folder, sample_size, seed):
+    """Decodes a reproducible random sample of the images in folder."""
+    file_paths = ImageRenamer(folder, None, None, cache=False).scan_input()
+    random.Random(seed).shuffle(file_paths)
+    images = []
+    for file_path in file_paths[:sample_size]:
+        with open(file_path, 'rb') as f:
+            images.append((os.path.basename(file_path), decode_image(io.BytesIO(f.read()))))
+    return images
+
+
+def caption_sample(config, images, batch_size):
+    """Captions the sample with the given InferenceConfig; returns (captions, seconds, load seconds)."""
+    registry = ModelRegistry.from_config(config)
+    started = time.perf_counter()
+    captioner = registry.get_captioner()
+    load_seconds = time.perf_counter() - started
+
+    # One untimed batch so lazy initialization doesn't count against either backend
+    captioner.caption([image for _, image in images[:1]])
+
+    captions = []
+    started = time.perf_counter()
+    for start in range(0, len(images), batch_size):
+        captions.extend(captioner.caption([image for _, image in images[start:start + batch_size]]))
+    seconds = time.perf_counter() - started
+
+    registry.unload()
+    return captions, seconds, load_seconds
+
+
+def token_f1(reference, candidate):
+    """F1 overlap of the two captions' lowercase word sets."""
+    reference_tokens = set(reference.lower().split())
+    candidate_tokens = set(candidate.lower().split())
+    common = len(reference_tokens & candidate_tokens)
+    if not common:
+        return 0.0
+    precision = common / len(candidate_tokens)
+    recall = common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def compare(baseline, candidate):
+    exact = sum(1 for a, b in zip(baseline, candidate) if a.strip().lower() == b.strip().lower())
+    f1_scores = [token_f1(a, b) for a, b in zip(baseline, candidate)]
+    similarity = [difflib.SequenceMatcher(None, a.lower(), b.lower()).ratio() for a, b in zip(baseline, candidate)]
+    count = len(baseline) or 1
+    return {
+        "exact_match_rate": round(exact / count, 4),
+        "mean_token_f1": round(sum(f1_scores) / count, 4),
+        "mean_similarity": round(sum(similarity) / count, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare captions from an optimized inference backend against the fp32 baseline."
+    )
+    parser.add_argument("folder", help="folder of sample images")
+    parser.add_argument("--sample", type=int, default=50, help="number of images to compare")
+    parser.add_argument("--backend", default="int8", choices=INFERENCE_BACKENDS, help="candidate backend")
+    parser.add_argument("--compile", action="store_true", help="also torch.compile the candidate")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads for both runs")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="optional JSON report path")
+    args = parser.parse_args()
+
+    images = load_sample(args.folder, args.sample, args.seed)
+    if not images:
+        parser.error(f"no images found in {args.folder}")
+
+    baseline_config = InferenceConfig("fp32", num_threads=args.threads)
+    candidate_config = InferenceConfig(args.backend, num_threads=args.threads, compile_model=args.compile)
+    baseline, baseline_seconds, baseline_load = caption_sample(baseline_config, images, args.batch_size)
+    candidate, candidate_seconds, candidate_load = caption_sample(candidate_config, images, args.batch_size)
+
+    report = {
+        "sample_size": len(images),
+        "baseline": {"variant": baseline_config.variant, "seconds": round(baseline_seconds, 3),
+                     "load_seconds": round(baseline_load, 3),
+                     "images_per_second": round(len(images) / baseline_seconds, 3)},
+        "candidate": {"variant": candidate_config.variant, "seconds": round(candidate_seconds, 3),
+                      "load_seconds": round(candidate_load, 3),
+                      "images_per_second": round(len(images) / candidate_seconds, 3)},
+        "speedup": round(baseline_seconds / candidate_seconds, 3),
+        "quality": compare(baseline, candidate),
+        "captions": [
+            {"file": name, "baseline": a, "candidate": b}
+            for (name, _), a, b in zip(images, baseline, candidate)
+        ],
+    }
+
+    for (name, _), a, b in zip(images, baseline, candidate):
+        if a != b:
+            print(f"{name}:\n  {baseline_config.variant}: {a}\n  {candidate_config.variant}: {b}")
+    print(f"\n{candidate_config.variant} vs {baseline_config.variant} on {len(images)} images:")
+    print(f"  speedup:          {report['speedup']}x "
+          f"({report['baseline']['images_per_second']} -> {report['candidate']['images_per_second']} images/s)")
+    for metric, value in report["quality"].items():
+        print(f"  {metric + ':':<17} {value}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,694 @@
+import io
+import itertools
+import os
+import csv
+import queue
+import logging
+import time
+import threading
+from collections import namedtuple
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PIL import Image
+from image_decode import decode_image, ImageTooLargeError, DEFAULT_TARGET_SIZE, DEFAULT_MAX_DECODE_BYTES
+from model_registry import registry as default_registry, BLIP_MODEL_NAME, BART_MODEL_NAME
+from caption_cache import CaptionCache, get_default_cache
+from run_journal import RunJournal
+from naming_index import NamingIndex
+from scanner import iter_image_files, StreamingScan
+from metrics import Metrics, default_metrics
+from near_duplicates import NearDuplicateIndex, DuplicateGroup, dhash
+from exporters import get_exporter, link_or_copy
+from text_engine import default_text_engine, ADOBE_STOCK_CATEGORIES, SHUTTERSTOCK_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the text post-processing changes so stale cache entries are ignored
+CACHE_FORMAT_VERSION = "2"
+
+# How captions shorter than short_caption_words are paraphrased:
+# "full" always uses the 50-200 token summary, "cap" limits generation to the
+# caption's own length and "skip" keeps the sanitized caption as is.
+PARAPHRASE_POLICIES = ("full", "cap", "skip")
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+# An image read by the prefetch stage: either a cached record or a decoded image to caption,
+# with its perceptual hash when near-duplicate grouping is on
+LoadedImage = namedtuple("LoadedImage", ["path", "key", "record", "image", "phash"], defaults=(None,))
+
+def is_image_file(filename):
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class ImageRenamer:
+    """Captions, renames and catalogs a folder of images without any GUI dependency.
+
+    Progress is reported through the optional on_progress(percentage), on_finished()
+    and on_stopped() callbacks so the same core can drive the Qt app and the web app.
+
+    stock_site is a site name or a list of them. With several sites every image is
+    captioned once: the first site's files and CSV go in the output folder as usual,
+    and each other site gets a subfolder with its own names (hard links where possible)
+    and CSV, written in the same pass.
+    """
+
+    def __init__(self, input_folder, output_folder, stock_site, batch_size=8, registry=None, cache=None,
+                 paraphrase_policy="cap", short_caption_words=20, paraphrase_batch_size=16,
+                 decode_workers=4, prefetch=None, text_engine=None,
+                 decode_size=DEFAULT_TARGET_SIZE, max_decode_bytes=DEFAULT_MAX_DECODE_BYTES,
+                 metrics=None, recursive=False, near_duplicate_distance=None, on_progress=None, on_finished=None, on_stopped=None):
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        if stock_site is None:
+            site_names = []
+        elif isinstance(stock_site, str):
+            site_names = [stock_site]
+        else:
+            site_names = list(stock_site)
+        # A single site stays a plain name so journals match whichever way it was given
+        self.stock_site = site_names[0] if len(site_names) == 1 else (site_names or None)
+        self.exporters = [get_exporter(name) for name in site_names]
+        self.recursive = recursive
+        self.batch_size = max(1, int(batch_size))
+        self.decode_workers = max(1, int(decode_workers))
+        self.prefetch = prefetch or self.batch_size * 2
+        # Decode at the resolution BLIP needs (None for full size), refusing oversized images
+        self.decode_size = decode_size
+        self.max_decode_bytes = max_decode_bytes
+        if paraphrase_policy not in PARAPHRASE_POLICIES:
+            raise ValueError(f"paraphrase_policy must be one of {PARAPHRASE_POLICIES}")
+        self.paraphrase_policy = paraphrase_policy
+        self.short_caption_words = short_caption_words
+        self.paraphrase_batch_size = paraphrase_batch_size
+        self.registry = registry or default_registry
+        # With a distance, images whose perceptual hashes differ by at most that many bits
+        # reuse the first one's description instead of being captioned again
+        self.near_duplicate_distance = near_duplicate_distance
+        if near_duplicate_distance is None:
+            self.duplicate_index = None
+        else:
+            self.duplicate_index = NearDuplicateIndex(near_duplicate_distance)
+        self.text_engine = text_engine or default_text_engine
+        # None uses the shared on-disk cache, False disables caching
+        if cache is False:
+            self.cache = None
+        else:
+            self.cache = get_default_cache() if cache is None else cache
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Per-run metrics, forwarded to the process-wide (or given) parent
+        self.parent_metrics = metrics or default_metrics
+        self.metrics = Metrics(parent=self.parent_metrics)
+        self.run_summary = None
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.on_stopped = on_stopped
+        # CSV path per site name
+        self.csv_filenames = {}
+        self._naming_index = None
+        self._stop_flag = False
+
+    def run(self):
+        self.metrics = Metrics(parent=self.parent_metrics)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Pick up where a stopped or crashed run left off, or start a new journal
+        journal = RunJournal(self.output_folder, self.run_name())
+        resuming = journal.load() and journal.header.get("stock_site") == self.stock_site
+        finished = set()
+        if resuming:
+            journal.recover()
+            finished = {entry["source"] for entry in journal.entries}
+
+        # A single scandir walk feeds the pipeline; it runs ahead in its own thread and counts
+        # the images as it goes, so the tree is listed once and never held in memory
+        scan = StreamingScan(file_path for file_path in self.iter_input() if file_path not in finished)
+        try:
+            first_path = next(scan, None)
+            if first_path is None and not resuming:
+                # Nothing to do: leave an empty CSV per site, as before, but no journal
+                self.csv_filenames = self.start_csvs(0)
+                self.run_summary = self.metrics.summary()
+                logger.info("No images found in %s", self.input_folder)
+                self._notify(self.on_finished)
+                return
+            file_paths = itertools.chain([first_path], scan) if first_path is not None else scan
+
+            if resuming:
+                self.restore_csv_filenames(journal.header)
+                date_str = journal.header["date_str"]
+                # Rebuild the CSVs from the journal in case rows were lost in a crash
+                self.rebuild_csvs(journal.entries)
+                journal.resume()
+                logger.info("Resuming run: %d images already done", len(journal.entries))
+            else:
+                date_str = datetime.now().strftime("%Y%m%d")  # Get the current date in YYYYMMDD format
+                # The number of photos isn't known yet; the CSVs are renamed once the run finishes
+                self.csv_filenames = self.start_csvs()
+                journal.start(stock_site=self.stock_site, csv_filename=self.csv_filename,
+                              csv_filenames=self.csv_filenames, date_str=date_str)
+
+            done_before = len(journal.entries)
+
+            def total_files():
+                done = scan.done
+                return done_before + scan.found, done
+
+            try:
+                self.process_files(file_paths, journal, date_str, total_files)
+            finally:
+                journal.close()
+        finally:
+            scan.close()
+        self.metrics.observe("scan", scan.seconds)
+
+        if self._stop_flag:
+            self._notify(self.on_stopped)
+            return
+
+        # Every row is already in the CSV, so the journal is no longer needed
+        total_photos = len(journal.entries)
+        journal.finish()
+        self.finish_csvs(total_photos)
+
+        if self.cache is not None:
+            logger.info("Caption cache: %d hits, %d misses", self.cache_hits, self.cache_misses)
+
+        self.run_summary = self.metrics.summary()
+        logger.info("Processed %d images in %.1fs (%.2f images/s)", self.run_summary["images"],
+                    self.run_summary["elapsed_seconds"], self.run_summary["images_per_second"] or 0)
+
+        self._notify(self.on_finished)
+
+    def process_files(self, file_paths, journal, date_str, total_files=None):
+        """Describes, renames and journals file_paths, appending their rows to each site's CSV.
+
+        file_paths may be any iterable, including a generator; without total_files it must
+        be a list so progress can be computed. total_files is either the number of files in
+        the run or a callable returning the count so far and whether it is final.
+
+        Numbering continues from the journal, so callers that keep a journal open (such as
+        the watch-folder daemon) can feed files in several calls without reloading anything.
+        """
+        if total_files is None:
+            total_files = len(journal.entries) + len(file_paths)
+
+        # Renames and CSV rows are handled by a writer thread fed through a bounded queue
+        write_queue = queue.Queue(maxsize=self.batch_size * 2)
+        write_errors = []
+        writer = threading.Thread(target=self._write_results,
+                                  args=(write_queue, journal, date_str, total_files, write_errors), daemon=True)
+        writer.start()
+
+        described_batches = self.describe_batches(file_paths)
+        try:
+            for batch in described_batches:
+                for item in batch:
+                    write_queue.put(item)
+                if self._stop_flag or write_errors:
+                    break
+        finally:
+            described_batches.close()
+            write_queue.put(None)
+            writer.join()
+
+        if write_errors:
+            raise write_errors[0]
+
+    def iter_input(self):
+        """Yields the paths of the images in the input folder (and its subfolders when recursive)."""
+        return iter_image_files(self.input_folder, is_image_file, recursive=self.recursive,
+                                exclude=[self.output_folder])
+
+    def scan_input(self):
+        """Returns the paths of the images in the input folder as a list."""
+        return list(self.iter_input())
+
+    def _prefetch(self, file_paths, loader=None):
+        """Yields a LoadedImage per path, in order, while a thread pool reads and decodes ahead.
+
+        At most `prefetch` images are in flight at once so memory stays flat on large folders.
+        loader(item) replaces load_image for sources other than files on disk.
+        """
+        loader = loader or self.load_image
+        pending = queue.Queue(maxsize=self.prefetch)
+        closed = threading.Event()
+
+        def produce():
+            try:
+                for file_path in file_paths:
+                    if self._stop_flag or closed.is_set():
+                        break
+                    pending.put(executor.submit(loader, file_path))
+            finally:
+                pending.put(None)
+
+        with ThreadPoolExecutor(max_workers=self.decode_workers) as executor:
+            producer = threading.Thread(target=produce, daemon=True)
+            producer.start()
+            try:
+                while True:
+                    future = pending.get()
+                    if future is None:
+                        break
+                    yield future.result()
+            finally:
+                closed.set()
+                # Unblock the producer and drop whatever it had already queued
+                while producer.is_alive() or not pending.empty():
+                    try:
+                        future = pending.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if future is None:
+                        break
+                    future.cancel()
+                producer.join()
+
+    def describe_batches(self, file_paths, loader=None):
+        """Yields lists of (file_path, record) pairs, in input order, one list per batch.
+
+        Images are read and decoded ahead of inference by a thread pool.
+        """
+        loaded_images = self._prefetch(file_paths, loader)
+        try:
+            batch = []
+            for loaded in loaded_images:
+                batch.append(loaded)
+                if len(batch) == self.batch_size:
+                    yield list(zip([loaded.path for loaded in batch], self.describe_loaded(batch)))
+                    batch = []
+                if self._stop_flag:
+                    return
+            if batch:
+                yield list(zip([loaded.path for loaded in batch], self.describe_loaded(batch)))
+        finally:
+            loaded_images.close()
+
+    def _write_results(self, write_queue, journal, date_str, total_files, errors):
+        """Writer stage: journals each described image, moves it into the output folder and
+        appends its CSV rows straight away so nothing is lost if the run stops early."""
+        naming_index = self.naming_index()
+        processed = len(journal.entries)
+
+        with ExitStack() as stack:
+            csvfiles = []
+            writers = {}
+            for exporter in self.exporters:
+                csvfile = stack.enter_context(open(self.csv_filenames[exporter.name], 'a', newline=''))
+                csvfiles.append(csvfile)
+                writers[exporter.name] = csv.DictWriter(csvfile, fieldnames=exporter.columns, extrasaction='ignore')
+
+            while True:
+                item = write_queue.get()
+                if item is None:
+                    return
+                if errors:
+                    # Keep draining so the inference stage never blocks on a full queue
+                    continue
+
+                file_path, record = item
+                processed += 1
+                if record is None:
+                    # Skipped image: leave it in the input folder
+                    self.metrics.increment("images_skipped")
+                    self._notify(self.on_progress, self._progress(processed, total_files))
+                    continue
+
+                try:
+                    write_started = time.perf_counter()
+
+                    # Generate a unique filename with numeric date and incremental numbering
+                    original_extension = os.path.splitext(file_path)[1]
+                    number, new_filename = self.allocate_filename(naming_index, date_str, original_extension)
+                    new_file_path = os.path.join(self.output_folder, new_filename)
+                    row = self.build_row(new_filename, record)
+
+                    # The other sites get the same image under their own name in their subfolder
+                    extra = []
+                    for exporter in self.exporters[1:]:
+                        site_filename = f"{exporter.filename(date_str, number)}{original_extension}"
+                        extra.append({"site": exporter.name,
+                                      "target": os.path.join(self.site_folder(exporter), site_filename),
+                                      "row": exporter.build_row(site_filename, record)})
+
+                    # Journal first, so a crash before the rename can be completed on resume
+                    journal.record(file_path, new_file_path, number, row, extra)
+
+                    # Rename the file by moving it to the output folder
+                    os.rename(file_path, new_file_path)
+                    for site_entry in extra:
+                        link_or_copy(new_file_path, site_entry["target"])
+
+                    writers[self.exporter.name].writerow(row)
+                    for site_entry in extra:
+                        writers[site_entry["site"]].writerow(site_entry["row"])
+                    for csvfile in csvfiles:
+                        csvfile.flush()
+                    self.metrics.observe("write", time.perf_counter() - write_started)
+                    self.metrics.increment("images_processed")
+
+                    # Update progress bar
+                    self._notify(self.on_progress, self._progress(processed, total_files))
+                except Exception as e:
+                    errors.append(e)
+
+    @staticmethod
+    def _progress(processed, total_files):
+        """Percentage done, given the file count or a callable returning (count so far, final)."""
+        if callable(total_files):
+            total, final = total_files()
+        else:
+            total, final = total_files, True
+        # Files added after the total was taken can take the count past it
+        percentage = min(100, int(processed / total * 100)) if total else 100
+        # Never claim to be done while the input is still being counted
+        return percentage if final else min(99, percentage)
+
+    @property
+    def exporter(self):
+        """The first selected site's exporter, which names the files in the output folder."""
+        return self.exporters[0]
+
+    @property
+    def csv_filename(self):
+        """The first selected site's CSV."""
+        return self.csv_filenames.get(self.exporter.name) if self.exporters else None
+
+    @csv_filename.setter
+    def csv_filename(self, csv_filename):
+        self.csv_filenames[self.exporter.name] = csv_filename
+
+    def build_row(self, filename, record):
+        """Builds the CSV row for the selected stock site."""
+        return self.exporter.build_row(filename, record)
+
+    def load_image(self, file_path):
+        """Reads an image, looking it up in the cache and decoding it only on a miss."""
+        with self.metrics.stage("read"):
+            with open(file_path, 'rb') as f:
+                image_bytes = f.read()
+        return self.load_bytes(file_path, image_bytes)
+
+    def load_bytes(self, path, image_bytes):
+        """Like load_image, for an image already read into memory (e.g. from an archive)."""
+        key = None
+        if self.cache is not None:
+            with self.metrics.stage("cache_lookup"):
+                key = CaptionCache.make_key(image_bytes, self.cache_version())
+                record = self.cache.get(key)
+            if record is not None:
+                return LoadedImage(path, key, record, None)
+
+        try:
+            with self.metrics.stage("decode"):
+                image = decode_image(io.BytesIO(image_bytes), self.decode_size, self.max_decode_bytes)
+        except (ImageTooLargeError, Image.DecompressionBombError, OSError) as e:
+            # Too large, truncated or not an image at all (UnidentifiedImageError is an OSError)
+            logger.warning("Skipping %s: %s", path, e)
+            return LoadedImage(path, key, None, None)
+
+        phash = None
+        if self.duplicate_index is not None:
+            with self.metrics.stage("dhash"):
+                phash = dhash(image)
+        return LoadedImage(path, key, None, image, phash)
+
+    def describe_images(self, file_paths):
+        """Returns the caption, title, keywords and categories for each image, in order."""
+        return self.describe_loaded([self.load_image(file_path) for file_path in file_paths])
+
+    def describe_loaded(self, loaded_images):
+        """Returns the metadata record for each LoadedImage, in order.
+
+        Images already seen with the same content and model configuration are served
+        from the cache; the rest are captioned in a single batch. With near-duplicate
+        grouping on, only the first image of each group of near-identical frames is
+        captioned and the others reuse its record. Images that could not be decoded get
+        a None record.
+        """
+        records = [loaded.record for loaded in loaded_images]
+        misses = [index for index, loaded in enumerate(loaded_images)
+                  if loaded.record is None and loaded.image is not None]
+        if self.cache is not None:
+            hits = sum(1 for loaded in loaded_images if loaded.record is not None)
+            self.cache_hits += hits
+            self.cache_misses += len(misses)
+            self.metrics.increment("cache_hits", hits)
+            self.metrics.increment("cache_misses", len(misses))
+
+        # Split the misses into group leaders, which are captioned, and their near-duplicates
+        duplicates = []
+        leaders = {}
+        if self.duplicate_index is not None:
+            to_caption = []
+            for index in misses:
+                phash = loaded_images[index].phash
+                group = self.duplicate_index.find(phash)
+                if group is None:
+                    group = leaders[index] = DuplicateGroup()
+                    self.duplicate_index.add(phash, group)
+                    to_caption.append(index)
+                else:
+                    duplicates.append((index, group))
+            misses = to_caption
+
+        if misses:
+            # Generate captions for the whole batch using the shared BLIP captioner
+            try:
+                captioner = self.registry.get_captioner()
+                with self.metrics.stage("caption"):
+                    blip_captions = captioner.caption([loaded_images[index].image for index in misses])
+                described = self.describe_captions(blip_captions)
+            except Exception:
+                if self.duplicate_index is not None:
+                    # Don't leave groups behind whose leader was never described
+                    self.duplicate_index.clear()
+                raise
+
+            for index, record in zip(misses, described):
+                records[index] = record
+                if index in leaders:
+                    leaders[index].record = record
+                if self.cache is not None:
+                    self.cache.put(loaded_images[index].key, record)
+
+        # Reused records aren't cached: they describe the group leader, not this exact image
+        for index, group in duplicates:
+            records[index] = group.member_record(self.text_engine)
+        if duplicates:
+            self.metrics.increment("near_duplicates", len(duplicates))
+
+        return records
+
+    def describe_captions(self, blip_captions):
+        """Turns raw BLIP captions into the title, keywords and categories for both stock sites."""
+        # Sanitize titles
+        with self.metrics.stage("text"):
+            titles = self.text_engine.sanitize_titles(blip_captions)
+
+        # Paraphrase the titles for better readability, as one batch
+        final_titles = self.paraphrase_texts(titles)
+
+        # Generate keywords and select categories for the whole chunk
+        with self.metrics.stage("text"):
+            details_list = self.text_engine.describe_titles(final_titles)
+        records = []
+        for blip_caption, final_title, details in zip(blip_captions, final_titles, details_list):
+            records.append(dict(details, caption=blip_caption, title=final_title))
+        return records
+
+    def cache_version(self):
+        """Identifies the models and settings that produced a cached record."""
+        # decode_size changes the pixels BLIP sees, so it is part of the version too
+        return (f"{CACHE_FORMAT_VERSION}|{BLIP_MODEL_NAME}|{BART_MODEL_NAME}|{self.registry.variant}|"
+                f"decode:{self.decode_size}|{self.paraphrase_policy}:{self.short_caption_words}|"
+                f"{self.text_engine.fingerprint}")
+
+    def stop(self):
+        self._stop_flag = True
+
+    @staticmethod
+    def _notify(callback, *args):
+        if callback is not None:
+            callback(*args)
+
+    def sanitize_title(self, title):
+        """Sanitize the title by removing unwanted elements."""
+        return self.text_engine.sanitize_title(title)
+
+    def paraphrase_text(self, text):
+        """Paraphrase the title to ensure readability and uniqueness."""
+        return self.paraphrase_texts([text])[0]
+
+    def paraphrase_texts(self, texts):
+        """Paraphrases a batch of titles in at most two pipeline calls.
+
+        Titles shorter than short_caption_words are skipped or generated with a capped
+        length, depending on paraphrase_policy, instead of being padded out to 50 tokens.
+        """
+        paraphrased = list(texts)
+        groups = self.paraphrase_groups(texts)
+
+        if groups:
+            paraphraser = self.registry.get_paraphraser()
+            for indices, settings in groups:
+                with self.metrics.stage("paraphrase"):
+                    outputs = paraphraser.paraphrase([texts[index] for index in indices],
+                                                     batch_size=self.paraphrase_batch_size,
+                                                     do_sample=False, **settings)
+                for index, output in zip(indices, outputs):
+                    paraphrased[index] = output
+
+        return [self.finalize_title(text) for text in paraphrased]
+
+    def paraphrase_groups(self, texts):
+        """Returns (indices, generation settings) for each pipeline call a batch of titles needs.
+
+        Long titles (and every title under the "full" policy) share the 50-200 token
+        summary settings. Under "cap", all short titles of the batch share one call whose
+        length limits span the shortest and longest of them, so a chunk never splits into
+        a call per caption length. Titles left alone are not in any group.
+        """
+        full, capped = [], []
+        for index, text in enumerate(texts):
+            word_count = len(text.split())
+            if self.paraphrase_policy == "full" or word_count >= self.short_caption_words:
+                full.append(index)
+            elif self.paraphrase_policy == "cap" and word_count:
+                capped.append(index)
+
+        groups = []
+        if full:
+            groups.append((full, {"max_length": 200, "min_length": 50}))
+        if capped:
+            # Let BART rephrase short captions without padding them out
+            word_counts = [len(texts[index].split()) for index in capped]
+            groups.append((capped, {"max_length": min(200, 2 * max(word_counts) + 10),
+                                    "min_length": min(word_counts)}))
+        return groups
+
+    def finalize_title(self, paraphrased_text):
+        """Removes repeated words and makes sure the title ends with a period."""
+        return self.text_engine.finalize_title(paraphrased_text)
+
+    def generate_keywords(self, title):
+        """Generates keywords based on the title."""
+        return self.text_engine.generate_keywords(title)
+
+    def remove_institution_names_and_websites_from_keywords(self, keywords):
+        """Removes any institution names and website addresses from the keywords."""
+        return self.text_engine.filter_keywords(keywords)
+
+    def select_category_based_on_keywords(self, keywords):
+        """Selects the appropriate Adobe Stock category based on keywords."""
+        return self.text_engine.select_adobe_category(keywords)
+
+    def select_shutterstock_categories(self, keywords):
+        """Selects two appropriate Shutterstock categories based on keywords."""
+        return self.text_engine.select_shutterstock_categories(keywords)
+
+    def filename_prefix(self):
+        return self.exporter.filename_prefix
+
+    def get_incremental_filename(self, date_str, incremental_number):
+        """Generates a filename with numeric date and incremental numbering for the selected stock site."""
+        return self.exporter.filename(date_str, incremental_number)
+
+    def naming_index(self):
+        """Returns the persistent naming index of the output folder."""
+        if self._naming_index is None or self._naming_index.output_folder != self.output_folder:
+            self._naming_index = NamingIndex(self.output_folder)
+        return self._naming_index
+
+    def allocate_filename(self, naming_index, date_str, extension):
+        """Reserves the next free sequence number for today's prefix; returns (number, filename).
+
+        The number is shared by every selected site, so it is only used once it is free in
+        each site's folder.
+        """
+        stem = f"{self.filename_prefix()}_{date_str}"
+        while True:
+            number = naming_index.reserve(stem)
+            filename = f"{self.get_incremental_filename(date_str, number)}{extension}"
+            # Guards against files copied in behind the index's back, or a lost index
+            if not any(os.path.exists(os.path.join(self.site_folder(exporter),
+                                                   f"{exporter.filename(date_str, number)}{extension}"))
+                       for exporter in self.exporters):
+                return number, filename
+
+    def csv_site_name(self):
+        return self.exporter.csv_name
+
+    def run_name(self):
+        """Names the run's journal after every selected site."""
+        return "_".join(exporter.csv_name for exporter in self.exporters)
+
+    def site_folder(self, exporter):
+        """Where a site's files and CSV go: the output folder for the first site, a subfolder for the others."""
+        if exporter is self.exporter:
+            return self.output_folder
+        return os.path.join(self.output_folder, exporter.csv_name)
+
+    def csv_columns(self):
+        return self.exporter.columns
+
+    def default_csv_name(self, total_photos):
+        return self.exporter.default_csv_name(total_photos)
+
+    def write_csv(self, data, csvfile, exporter=None):
+        """Writes the header and rows for the selected stock site to an open text file."""
+        (exporter or self.exporter).write_csv(data, csvfile)
+
+    def save_csv(self, data, output_folder, total_photos=None, csv_filename=None, exporter=None):
+        """Saves the data into a CSV file for the selected stock site, or the given exporter's site."""
+        exporter = exporter or self.exporter
+        if csv_filename is None:
+            csv_filename = os.path.join(output_folder, exporter.default_csv_name(total_photos))
+
+        with open(csv_filename, 'w', newline='') as csvfile:
+            exporter.write_csv(data, csvfile)
+
+        return csv_filename
+
+    def start_csvs(self, total_photos=None):
+        """Creates an empty CSV for every selected site; returns {site name: path}.
+
+        Without total_photos the CSVs get a provisional name until finish_csvs.
+        """
+        csv_filenames = {}
+        for exporter in self.exporters:
+            folder = self.site_folder(exporter)
+            os.makedirs(folder, exist_ok=True)
+            csv_filename = None
+            if total_photos is None:
+                csv_filename = os.path.join(folder, exporter.partial_csv_name())
+            csv_filenames[exporter.name] = self.save_csv([], folder, total_photos, csv_filename, exporter)
+        return csv_filenames
+
+    def finish_csvs(self, total_photos):
+        """Renames every site's CSV to its final name, which includes the number of photos."""
+        for exporter in self.exporters:
+            csv_filename = self.csv_filenames[exporter.name]
+            final_filename = os.path.join(os.path.dirname(csv_filename), exporter.default_csv_name(total_photos))
+            os.replace(csv_filename, final_filename)
+            self.csv_filenames[exporter.name] = final_filename
+
+    def restore_csv_filenames(self, header):
+        """Takes the CSV paths over from a journal header."""
+        # Journals written before multi-site export only name the one CSV
+        self.csv_filenames = dict(header.get("csv_filenames") or {self.exporter.name: header["csv_filename"]})
+
+    def rebuild_csvs(self, entries):
+        """Rewrites every site's CSV from the rows in journal entries."""
+        for exporter in self.exporters:
+            if exporter is self.exporter:
+                rows = [entry["row"] for entry in entries]
+            else:
+                rows = [site_entry["row"] for entry in entries for site_entry in entry.get("extra", ())
+                        if site_entry["site"] == exporter.name]
+            self.save_csv(rows, self.site_folder(exporter), csv_filename=self.csv_filenames[exporter.name],
+                          exporter=exporter)
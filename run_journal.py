@@ -0,0 +1,84 @@
+import os
+import json
+from exporters import link_or_copy
+
+
+class RunJournal:
+    """Append-only journal of the files a run has finished, kept in the output folder.
+
+    The first line describes the run (CSV file, date and numbering); every further line
+    records one image as {"source", "target", "number", "row"}, plus an "extra" list of
+    {"site", "target", "row"} for the other sites of a multi-site run. Entries are
+    written and flushed to disk *before* the file is renamed, so after a stop or a crash
+    the next run can redo any half-finished rename, rebuild the CSVs and skip the
+    finished files.
+    """
+
+    def __init__(self, output_folder, name):
+        self.path = os.path.join(output_folder, f".pixelpure_{name}_journal.jsonl")
+        self.header = None
+        self.entries = []
+        self._file = None
+
+    def load(self):
+        """Reads an unfinished journal; returns True if there is a run to resume."""
+        self.header = None
+        self.entries = []
+        if not os.path.exists(self.path):
+            return False
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line means its rename never happened
+                    break
+                if self.header is None:
+                    self.header = record
+                else:
+                    self.entries.append(record)
+        return self.header is not None
+
+    def start(self, **header):
+        """Starts a new journal, replacing any previous one."""
+        self.header = header
+        self.entries = []
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._append(header)
+
+    def resume(self):
+        """Reopens a loaded journal for appending."""
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, source, target, number, row, extra=None):
+        entry = {"source": source, "target": target, "number": number, "row": row}
+        if extra:
+            entry["extra"] = extra
+        self.entries.append(entry)
+        self._append(entry)
+
+    def recover(self):
+        """Completes renames that were journaled but not yet performed."""
+        for entry in self.entries:
+            if os.path.exists(entry["source"]) and not os.path.exists(entry["target"]):
+                os.rename(entry["source"], entry["target"])
+            for site_entry in entry.get("extra", ()):
+                if os.path.exists(entry["target"]) and not os.path.exists(site_entry["target"]):
+                    link_or_copy(entry["target"], site_entry["target"])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """Closes and deletes the journal once the run has completed."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _append(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
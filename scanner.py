@@ -0,0 +1,102 @@
+import os
+import time
+import queue
+import threading
+
+
+def iter_image_files(root, is_image_file, recursive=False, exclude=()):
+    """Yields the paths of the image files under root, one directory at a time.
+
+    Uses os.scandir so file types come from the directory listing itself rather than
+    a stat() per entry. Paths are sorted within each directory so the order is
+    deterministic, which means the matching paths of the directory being listed (not
+    every entry, and never the whole tree) are held in memory at once. Hidden entries
+    and any directory in exclude (such as an output folder nested inside the input
+    folder) are skipped.
+    """
+    excluded = {os.path.realpath(path) for path in exclude if path}
+    directories = [root]
+    while directories:
+        directory = directories.pop()
+        image_paths = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_file() and is_image_file(entry.name):
+                        image_paths.append(entry.path)
+                    elif recursive and entry.is_dir(follow_symlinks=False) \
+                            and os.path.realpath(entry.path) not in excluded:
+                        subdirectories.append(entry.path)
+        except (FileNotFoundError, PermissionError):
+            continue
+
+        image_paths.sort()
+        yield from image_paths
+        # Pushed in reverse so subdirectories are walked in name order
+        subdirectories.sort()
+        directories.extend(reversed(subdirectories))
+
+
+class StreamingScan:
+    """Walks paths once in a background thread, counting them while the pipeline consumes them.
+
+    The walk runs ahead of the consumer by at most lookahead paths, so memory stays
+    bounded however big the tree is. found is the number of paths seen so far and is
+    final once done is set; for any folder the walk can finish ahead of the pipeline,
+    that is long before the last image is described.
+    """
+
+    _END = object()
+
+    def __init__(self, paths, lookahead=100000):
+        self.found = 0
+        self.done = False
+        self.seconds = 0.0
+        self._error = None
+        self._queue = queue.Queue(maxsize=lookahead)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._walk, args=(paths,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Give up once the consumer has gone away rather than blocking on a full queue
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _walk(self, paths):
+        started = time.perf_counter()
+        try:
+            for path in paths:
+                if not self._put(path):
+                    return
+                self.found += 1
+        except Exception as e:
+            self._error = e
+        finally:
+            self.seconds = time.perf_counter() - started
+            self.done = True
+            self._put(self._END)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = self._queue.get()
+        if item is self._END:
+            # Keep returning the end marker so the scan stays exhausted
+            self._queue.put(item)
+            if self._error is not None:
+                raise self._error
+            raise StopIteration
+        return item
+
+    def close(self):
+        self._closed.set()
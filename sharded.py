@@ -0,0 +1,120 @@
+import os
+import argparse
+import logging
+import multiprocessing
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from renamer_core import ImageRenamer
+from exporters import site_names
+
+# Per-process renamer used by the worker processes (see _init_worker)
+_worker_renamer = None
+
+
+def _init_worker(torch_threads, options):
+    """Runs once in every worker process: tunes torch and loads the models up front."""
+    global _worker_renamer
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    torch.set_num_interop_threads(1)
+
+    _worker_renamer = ImageRenamer(None, None, None, **options)
+    _worker_renamer.registry.warm_up()
+
+
+def _describe_shard(file_paths):
+    """Describes one shard of images in a worker process."""
+    _worker_renamer.cache_hits = 0
+    _worker_renamer.cache_misses = 0
+    records = _worker_renamer.describe_images(file_paths)
+    return records, _worker_renamer.cache_hits, _worker_renamer.cache_misses
+
+
+class ShardedImageRenamer(ImageRenamer):
+    """Runs inference in several worker processes, each with its own models and torch thread pool.
+
+    Shards are dispatched to the pool in input order and their results are consumed in the
+    same order, so the parent assigns get_incremental_filename numbers and writes a single
+    CSV exactly as the single-process run would.
+    """
+
+    def __init__(self, input_folder, output_folder, stock_site, workers=None, torch_threads=None,
+                 shard_size=None, **options):
+        self.workers = workers or max(1, (os.cpu_count() or 1) // 4)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        # Options that configure the worker renamers; callbacks stay in the parent and the
+        # registry, cache and metrics are per process (and can't be pickled), so each worker
+        # uses its own defaults
+        self.worker_options = {k: v for k, v in options.items()
+                               if not k.startswith("on_") and k not in ("registry", "cache", "metrics")}
+        if options.get("cache") is False:
+            self.worker_options["cache"] = False
+        self.worker_options["decode_workers"] = 1
+        super().__init__(input_folder, output_folder, stock_site, **options)
+        self.shard_size = shard_size or self.batch_size * 2
+
+    def describe_batches(self, file_paths, loader=None):
+        if loader is not None:
+            # Workers read their own files, so other sources are described in this process
+            yield from super().describe_batches(file_paths, loader)
+            return
+
+        # Shards are cut from file_paths as they are needed, so a streamed scan is never
+        # materialized; a few shards per worker are kept in flight to keep every worker busy
+        file_paths = iter(file_paths)
+        shards = iter(lambda: list(islice(file_paths, self.shard_size)), [])
+        first_shards = list(islice(shards, self.workers * 2))
+        if not first_shards:
+            return
+
+        # Spawn rather than fork so workers don't inherit the parent's threads or torch state
+        executor = ProcessPoolExecutor(max_workers=min(self.workers, len(first_shards)),
+                                       mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker,
+                                       initargs=(self.torch_threads, self.worker_options))
+        try:
+            in_flight = deque((shard, executor.submit(_describe_shard, shard)) for shard in first_shards)
+            while in_flight:
+                shard, future = in_flight.popleft()
+                if self._stop_flag:
+                    return
+                records, hits, misses = future.result()
+                next_shard = next(shards, None)
+                if next_shard is not None:
+                    in_flight.append((next_shard, executor.submit(_describe_shard, next_shard)))
+                self.cache_hits += hits
+                self.cache_misses += misses
+                yield list(zip(shard, records))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a large folder with several worker processes.")
+    parser.add_argument("input_folder")
+    parser.add_argument("output_folder")
+    parser.add_argument("--stock-site", nargs="+", default=["Adobe Stock"], choices=site_names(),
+                        help="one or more sites; every site after the first gets its own subfolder")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--torch-threads", type=int, default=None, help="torch threads per worker")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--recursive", action="store_true", help="also process images in subfolders")
+    parser.add_argument("--near-duplicates", type=int, default=None, metavar="BITS",
+                        help="caption near-identical frames once; maximum perceptual hash distance (e.g. 6)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    renamer = ShardedImageRenamer(args.input_folder, args.output_folder, args.stock_site,
+                                  workers=args.workers, torch_threads=args.torch_threads,
+                                  batch_size=args.batch_size, recursive=args.recursive,
+                                  near_duplicate_distance=args.near_duplicates,
+                                  on_progress=lambda value: logging.info("Progress: %d%%", value))
+    renamer.run()
+    for csv_filename in renamer.csv_filenames.values():
+        print(csv_filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+import re
+import random
+import hashlib
+
+# Adobe Stock Categories
+ADOBE_STOCK_CATEGORIES = {
+    "Animals": 1, "Buildings and Architecture": 2, "Business": 3, "Drinks": 4,
+    "The Environment": 5, "States of Mind": 6, "Food": 7, "Graphic Resources": 8,
+    "Hobbies and Leisure": 9, "Industry": 10, "Landscape": 11, "Lifestyle": 12,
+    "People": 13, "Plants and Flowers": 14, "Culture and Religion": 15,
+    "Science": 16, "Social Issues": 17, "Sports": 18, "Technology": 19,
+    "Transport": 20, "Travel": 21
+}
+
+# Shutterstock Categories
+SHUTTERSTOCK_CATEGORIES = [
+    "Abstract", "Animals/Wildlife", "Architecture", "Arts and Entertainment",
+    "Business/Finance", "Education", "Fashion", "Food/Drink", "Health/Medical",
+    "Holidays/Celebrations", "Industry/Crafts", "Nature", "People", "Religion",
+    "Science/Technology", "Sports/Recreation", "Transportation", "Travel/Destinations",
+    "Vintage", "Vectors/Illustrations"
+]
+
+# Names removed from titles and keywords
+INSTITUTION_NAMES = ["CNN", "BBC", "Harvard", "MIT"]  # Add more as needed
+
+ENGLISH_STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for',
+    'if', 'in', 'into', 'is', 'it', 'no', 'not', 'of', 'on', 'or',
+    'such', 'that', 'the', 'their', 'then', 'there', 'these', 'they',
+    'this', 'to', 'was', 'will', 'with'
+])
+
+URL_PATTERN = re.compile(r'(https?://|www\.)\S+')
+WORD_PATTERN = re.compile(r'\w+')
+KEYWORD_PATTERN = re.compile(r'\b\w+\b')
+SPECIAL_CHARACTERS_PATTERN = re.compile(r'[^\w\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+PROMOTIONAL_PATTERN = re.compile(
+    r'(for more,?\s*go to\s*|visit\s+\S+|CNN\.com.*?gallery|submit.*?shots.*?week|Please submit.*?shots|visit.*?next\s+Wednesday).*?$',
+    flags=re.IGNORECASE
+)
+
+# Words that open a phrase which can be moved to the front of a title to reword it
+MOVABLE_PHRASE_WORDS = frozenset(["on", "in", "at", "with", "near", "under", "during", "behind", "beside", "along"])
+ARTICLES = frozenset(["A", "An", "The"])
+DEFAULT_ADOBE_CATEGORY = "1"  # Default category if no match is found
+DEFAULT_SHUTTERSTOCK_CATEGORIES = ["Nature", "People"]  # Default categories if no match is found
+
+
+class PhraseMatcher:
+    """Finds whole-word occurrences of many phrases in a single pass over the text.
+
+    Phrases are stored in a trie keyed on their lowercased words, so the cost of a scan
+    depends on the length of the text, not on how many phrases are in the blocklist.
+    A match has the same meaning as re.search(r'\\b' + re.escape(phrase) + r'\\b', text,
+    re.IGNORECASE).
+    """
+
+    def __init__(self, phrases):
+        self._trie = {}
+        for phrase in phrases:
+            words = WORD_PATTERN.findall(phrase.lower())
+            if not words:
+                continue
+            node = self._trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node.setdefault(None, set()).add(phrase.lower())
+
+    def find_spans(self, text):
+        """Returns the (start, end) span of every leftmost-longest match in text."""
+        words = list(WORD_PATTERN.finditer(text))
+        spans = []
+        i = 0
+        while i < len(words):
+            node = self._trie
+            match_end = None
+            j = i
+            while j < len(words):
+                node = node.get(words[j].group().lower())
+                if node is None:
+                    break
+                # Words must also be separated exactly as in the phrase; the span is lowered on its
+                # own because lowering can change the length of text before it (e.g. "İ")
+                if None in node and text[words[i].start():words[j].end()].lower() in node[None]:
+                    match_end = j
+                j += 1
+
+            if match_end is None:
+                i += 1
+            else:
+                spans.append((words[i].start(), words[match_end].end()))
+                i = match_end + 1
+        return spans
+
+    def remove(self, text):
+        """Returns text with every match removed."""
+        pieces = []
+        last = 0
+        for start, end in self.find_spans(text):
+            pieces.append(text[last:start])
+            last = end
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+
+class TextEngine:
+    """Turns captions into stock titles, keywords and categories.
+
+    All patterns, blocklists and category indexes are built once when the engine is
+    created and reused for every caption, so one engine should be shared per process.
+    """
+
+    def __init__(self, institution_names=INSTITUTION_NAMES, adobe_categories=ADOBE_STOCK_CATEGORIES,
+                 shutterstock_categories=SHUTTERSTOCK_CATEGORIES):
+        self.institution_names = list(institution_names)
+        self._institution_matcher = PhraseMatcher(self.institution_names)
+        self._blocked_keywords = frozenset(self.institution_names)
+
+        # Adobe: a keyword matches a category when it is a substring of its name, so index
+        # every substring of every category name (first category in order wins)
+        self._adobe_index = {}
+        for category, category_num in adobe_categories.items():
+            name = category.lower()
+            for start in range(len(name)):
+                for end in range(start + 1, len(name) + 1):
+                    self._adobe_index.setdefault(name[start:end], str(category_num))
+
+        # Shutterstock: a category matches when its name is a substring of the keyword, so
+        # index the names by length and only slide windows of those lengths over a keyword
+        self._shutterstock_categories = list(shutterstock_categories)
+        self._shutterstock_index = {}
+        for position, category in enumerate(self._shutterstock_categories):
+            self._shutterstock_index.setdefault(category.lower(), position)
+        self._shutterstock_lengths = sorted({len(name) for name in self._shutterstock_index})
+
+        digest = hashlib.sha1("\n".join(self.institution_names).encode("utf-8"))
+        digest.update(repr(adobe_categories).encode("utf-8"))
+        digest.update(repr(self._shutterstock_categories).encode("utf-8"))
+        self.fingerprint = digest.hexdigest()[:12]
+
+    def sanitize_title(self, title):
+        """Sanitize the title by removing unwanted elements."""
+        # Remove "¬"
+        title = title.replace("¬", "")
+
+        # Remove any web addresses and phrases that include them
+        title = URL_PATTERN.sub('', title)
+
+        # Remove any institution names
+        title = self._institution_matcher.remove(title)
+
+        # Remove special characters
+        title = SPECIAL_CHARACTERS_PATTERN.sub('', title)
+
+        # Remove promotional phrases and requests to visit any place or website
+        title = PROMOTIONAL_PATTERN.sub('', title)
+
+        # Remove extra spaces after cleaning
+        title = WHITESPACE_PATTERN.sub(' ', title).strip()
+
+        # Ensure title is less than 200 characters
+        if len(title) > 200:
+            title = title[:200].rsplit(' ', 1)[0]
+
+        return title.strip()
+
+    def sanitize_titles(self, titles):
+        """Sanitizes a whole chunk of captions."""
+        return [self.sanitize_title(title) for title in titles]
+
+    def finalize_title(self, paraphrased_text):
+        """Removes repeated words and makes sure the title ends with a period."""
+        # Remove repeated words
+        words = paraphrased_text.split()
+        seen = set()
+        unique_words = [word for word in words if not (word in seen or seen.add(word))]
+
+        # Join words back into a sentence
+        final_title = ' '.join(unique_words)
+
+        # Ensure the final title is a complete sentence
+        if not final_title.endswith('.'):
+            final_title += '.'
+
+        return final_title.strip()
+
+    def title_variants(self, title):
+        """Rewordings of a final title, each with one of its trailing phrases moved to the front.
+
+        "A dog on the beach at sunset." gives "On the beach, a dog at sunset." and "At
+        sunset, a dog on the beach.": the same words in a different order, so frames that
+        share a description don't share a title. Phrases bound to a participle ("covered
+        in snow") stay where they are. Returns an empty list when nothing can be moved.
+        """
+        words = title.rstrip('.').split()
+        starts = [index for index in range(1, len(words))
+                  if words[index].lower() in MOVABLE_PHRASE_WORDS and not words[index - 1].lower().endswith("ed")]
+        variants = []
+        for start, end in zip(starts, starts[1:] + [len(words)]):
+            phrase = words[start:end]
+            rest = words[:start] + words[end:]
+            if rest[0] in ARTICLES:
+                rest = [rest[0].lower()] + rest[1:]
+            phrase = [phrase[0].capitalize()] + phrase[1:]
+            variants.append(f"{' '.join(phrase)}, {' '.join(rest)}.")
+        return variants
+
+    def generate_keywords(self, title):
+        """Generates keywords based on the title."""
+        words = set(KEYWORD_PATTERN.findall(title))
+        words = words.difference(ENGLISH_STOP_WORDS)
+        words = {word for word in words if len(word) > 1 and word.isalpha()}
+
+        if len(words) > 50:
+            keywords = random.sample(sorted(words), 50)
+        else:
+            keywords = list(words)
+
+        return keywords
+
+    def filter_keywords(self, keywords):
+        """Removes any institution names and website addresses from the keywords."""
+        return [keyword for keyword in keywords
+                if keyword not in self._blocked_keywords and not URL_PATTERN.match(keyword)]
+
+    def select_adobe_category(self, keywords):
+        """Selects the appropriate Adobe Stock category based on keywords."""
+        for keyword in keywords:
+            category_num = self._adobe_index.get(keyword.lower())
+            if category_num is not None:
+                return category_num
+        return DEFAULT_ADOBE_CATEGORY
+
+    def select_shutterstock_categories(self, keywords):
+        """Selects two appropriate Shutterstock categories based on keywords."""
+        selected = []
+        for keyword in keywords:
+            keyword = keyword.lower()
+            matches = set()
+            for length in self._shutterstock_lengths:
+                if length > len(keyword):
+                    break
+                for start in range(len(keyword) - length + 1):
+                    position = self._shutterstock_index.get(keyword[start:start + length])
+                    if position is not None:
+                        matches.add(position)
+
+            for position in sorted(matches):
+                if position not in selected:
+                    selected.append(position)
+                if len(selected) == 2:
+                    return [self._shutterstock_categories[position] for position in selected]
+
+        if not selected:
+            return list(DEFAULT_SHUTTERSTOCK_CATEGORIES)
+        return [self._shutterstock_categories[position] for position in selected]
+
+    def describe_title(self, final_title):
+        """Returns the keywords and both sites' categories for a final title."""
+        keywords = self.filter_keywords(self.generate_keywords(final_title))
+        return {
+            "keywords": keywords,
+            "category": self.select_adobe_category(keywords),
+            "categories": self.select_shutterstock_categories(keywords),
+        }
+
+    def describe_titles(self, final_titles):
+        """Batch version of describe_title for a whole chunk of titles."""
+        return [self.describe_title(final_title) for final_title in final_titles]
+
+
+default_text_engine = TextEngine()
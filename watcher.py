@@ -0,0 +1,220 @@
+import os
+import time
+import signal
+import logging
+import argparse
+from datetime import datetime
+from renamer_core import ImageRenamer, is_image_file
+from run_journal import RunJournal
+from exporters import site_names
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # Not on Linux, or the optional dependency isn't installed
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+
+class FolderWatcher:
+    """Headless daemon that processes images as they arrive in the input folder.
+
+    New files are picked up through inotify when inotify_simple is available, or by
+    polling the folder otherwise. A file is only processed once its size and mtime
+    have not changed for settle_seconds, so half-copied uploads are never touched.
+    Ready files are micro-batched (up to batch_size, or whatever is ready after
+    batch_window seconds) through one long-lived ImageRenamer whose models stay
+    loaded, and their rows are appended to a rolling CSV per day.
+    """
+
+    def __init__(self, input_folder, output_folder, stock_site, settle_seconds=2.0, batch_window=2.0,
+                 poll_interval=1.0, use_inotify=True, **renamer_options):
+        self.renamer = ImageRenamer(input_folder, output_folder, stock_site, **renamer_options)
+        self.input_folder = input_folder
+        self.output_folder = output_folder
+        self.settle_seconds = settle_seconds
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and INotify is not None
+        # path -> (size, mtime, time the size/mtime last changed)
+        self._pending = {}
+        # path -> (size, mtime) of files left in place after processing (e.g. too large to decode)
+        self._ignored = {}
+        self._ready_since = None
+        self._journal = None
+        self._date_str = None
+        self._stop_flag = False
+
+    def stop(self):
+        self._stop_flag = True
+        self.renamer.stop()
+
+    def run(self):
+        self.renamer.registry.warm_up()
+        inotify = self._start_inotify() if self.use_inotify else None
+        logger.info("Watching %s (%s)", self.input_folder, "inotify" if inotify else "polling")
+
+        # Pick up whatever is already waiting; after this only new arrivals are looked at
+        self._scan()
+        try:
+            while not self._stop_flag:
+                if inotify is not None:
+                    for event in inotify.read(timeout=int(self.poll_interval * 1000)):
+                        if event.name and is_image_file(event.name):
+                            self._track(os.path.join(self.input_folder, event.name))
+                else:
+                    time.sleep(self.poll_interval)
+                    self._scan()
+
+                ready = self._collect_ready()
+                if ready:
+                    self._process(ready)
+        finally:
+            if inotify is not None:
+                inotify.close()
+            if self._journal is not None:
+                self._journal.close()
+
+    def _start_inotify(self):
+        inotify = INotify()
+        inotify.add_watch(self.input_folder, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+        return inotify
+
+    def _scan(self):
+        with os.scandir(self.input_folder) as entries:
+            for entry in entries:
+                if entry.is_file() and is_image_file(entry.name):
+                    self._track(entry.path)
+
+    def _track(self, file_path):
+        if file_path in self._pending:
+            return
+        if file_path in self._ignored:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                del self._ignored[file_path]
+                return
+            if (stat.st_size, stat.st_mtime) == self._ignored[file_path]:
+                return
+            del self._ignored[file_path]
+        self._pending[file_path] = (-1, -1, time.monotonic())
+
+    def _collect_ready(self):
+        """Returns the tracked files that have stopped changing, once a batch is worth running."""
+        now = time.monotonic()
+        ready = []
+        for file_path, (size, mtime, changed_at) in list(self._pending.items()):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                del self._pending[file_path]
+                continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self._pending[file_path] = (stat.st_size, stat.st_mtime, now)
+            elif now - changed_at >= self.settle_seconds:
+                ready.append(file_path)
+
+        if not ready:
+            self._ready_since = None
+            return []
+        if self._ready_since is None:
+            self._ready_since = now
+        if len(ready) < self.renamer.batch_size and now - self._ready_since < self.batch_window:
+            return []
+
+        self._ready_since = None
+        return sorted(ready)
+
+    def _process(self, file_paths):
+        journal, date_str = self._open_journal()
+        started = time.monotonic()
+        try:
+            self.renamer.process_files(file_paths, journal, date_str)
+        except Exception:
+            logger.exception("Failed to process %d files", len(file_paths))
+            # The batch was aborted: files it didn't get to are tried again after settling
+            for file_path in file_paths:
+                if os.path.exists(file_path):
+                    size, mtime, _ = self._pending[file_path]
+                    self._pending[file_path] = (size, mtime, time.monotonic())
+                else:
+                    del self._pending[file_path]
+            return
+
+        # Processed files have moved away; skipped ones are only retried once they change
+        for file_path in file_paths:
+            size, mtime, _ = self._pending.pop(file_path)
+            if os.path.exists(file_path):
+                self._ignored[file_path] = (size, mtime)
+        logger.info("Processed %d new images in %.1fs", len(file_paths), time.monotonic() - started)
+
+    def _open_journal(self):
+        """Returns the journal and date for today's rolling CSVs, rolling over at midnight."""
+        date_str = datetime.now().strftime("%Y%m%d")
+        if self._date_str == date_str:
+            return self._journal, date_str
+
+        if self._journal is not None:
+            self._complete(self._journal)
+            self._journal.finish()
+
+        journal = RunJournal(self.output_folder, f"{self.renamer.run_name()}_rolling")
+        if journal.load() and journal.header.get("date_str") == date_str:
+            # Restarted on the same day: carry on with today's CSVs, minus anything lost in a crash
+            self._complete(journal)
+            journal.resume()
+        else:
+            if journal.header is not None:
+                # An earlier day's journal left by a stopped daemon; complete its CSVs, then drop it
+                self._complete(journal)
+                journal.finish()
+            csv_filenames = {}
+            for exporter in self.renamer.exporters:
+                folder = self.renamer.site_folder(exporter)
+                os.makedirs(folder, exist_ok=True)
+                csv_filename = os.path.join(folder, f"{exporter.csv_name}_rolling_{date_str}.csv")
+                if not os.path.exists(csv_filename):
+                    self.renamer.save_csv([], folder, csv_filename=csv_filename, exporter=exporter)
+                csv_filenames[exporter.name] = csv_filename
+            journal.start(stock_site=self.renamer.stock_site, csv_filename=csv_filenames[self.renamer.exporter.name],
+                          csv_filenames=csv_filenames, date_str=date_str)
+
+        self.renamer.restore_csv_filenames(journal.header)
+        self._journal, self._date_str = journal, date_str
+        return journal, date_str
+
+    def _complete(self, journal):
+        """Finishes the journal's interrupted renames and rewrites its CSVs from its entries."""
+        journal.recover()
+        self.renamer.restore_csv_filenames(journal.header)
+        self.renamer.rebuild_csvs(journal.entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and process new images as they arrive.")
+    parser.add_argument("input_folder")
+    parser.add_argument("output_folder")
+    parser.add_argument("--stock-site", nargs="+", default=["Adobe Stock"], choices=site_names(),
+                        help="one or more sites; every site after the first gets its own subfolder")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--settle-seconds", type=float, default=2.0,
+                        help="how long a file must stay unchanged before it is processed")
+    parser.add_argument("--batch-window", type=float, default=2.0,
+                        help="how long to wait for a full batch before processing a partial one")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--polling", action="store_true", help="poll even if inotify is available")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    watcher = FolderWatcher(args.input_folder, args.output_folder, args.stock_site,
+                            settle_seconds=args.settle_seconds, batch_window=args.batch_window,
+                            poll_interval=args.poll_interval, use_inotify=not args.polling,
+                            batch_size=args.batch_size)
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: watcher.stop())
+    watcher.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import io
+import time
+import logging
+import zipfile
+import posixpath
+from datetime import datetime
+from renamer_core import LoadedImage, is_image_file
+
+logger = logging.getLogger(__name__)
+
+# Members larger than this are left out rather than read into memory
+DEFAULT_MAX_MEMBER_BYTES = 200 * 1024 * 1024
+
+# How much of an image is copied into the response archive between yields
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable file object that zipfile writes into and the response drains.
+
+    Because it has no tell() or seek(), zipfile streams every member with a data descriptor
+    instead of going back to patch its header, so the archive is produced strictly in order.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def archive_images(archive):
+    """Returns the ZipInfo of every image in archive, in archive order.
+
+    Folders, hidden files and macOS resource forks (__MACOSX/) are ignored.
+    """
+    members = []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        parts = info.filename.split("/")
+        if parts[0] == "__MACOSX" or any(part.startswith('.') for part in parts):
+            continue
+        if is_image_file(parts[-1]):
+            members.append(info)
+    return members
+
+
+def stream_renamed_archive(renamer, archive_file, date_str=None, max_member_bytes=DEFAULT_MAX_MEMBER_BYTES):
+    """Yields a zip archive, chunk by chunk, of the renamed images in archive_file plus the site CSV.
+
+    Images are read from the uploaded archive straight into memory and described in
+    batches exactly as in a folder run, but nothing is extracted to disk: each renamed
+    image is copied from the input archive into the response as soon as its batch is
+    described, and the CSV is added last. Numbering starts at 1 for every archive.
+    Images that are too large or cannot be decoded are left out and logged.
+    """
+    date_str = date_str or datetime.now().strftime("%Y%m%d")
+    archive = zipfile.ZipFile(archive_file)
+    members = {info.filename: info for info in archive_images(archive)}
+
+    def load_member(name):
+        info = members[name]
+        if info.file_size > max_member_bytes:
+            logger.warning("Skipping %s: %d bytes is over the %d byte limit", name, info.file_size, max_member_bytes)
+            return LoadedImage(name, None, None, None)
+        with renamer.metrics.stage("read"):
+            with archive.open(info) as f:
+                # Read one byte past the limit so a lying header can't inflate memory use
+                image_bytes = f.read(max_member_bytes + 1)
+        if len(image_bytes) > max_member_bytes:
+            logger.warning("Skipping %s: larger than the %d byte limit", name, max_member_bytes)
+            return LoadedImage(name, None, None, None)
+        return renamer.load_bytes(name, image_bytes)
+
+    buffer = _StreamBuffer()
+    rows = []
+    number = 1
+    described_batches = renamer.describe_batches(list(members), loader=load_member)
+    try:
+        with zipfile.ZipFile(buffer, "w") as output:
+            for batch in described_batches:
+                for name, record in batch:
+                    if record is None:
+                        renamer.metrics.increment("images_skipped")
+                        continue
+
+                    write_started = time.perf_counter()
+                    extension = posixpath.splitext(name)[1]
+                    new_filename = f"{renamer.get_incremental_filename(date_str, number)}{extension}"
+                    number += 1
+                    rows.append(renamer.build_row(new_filename, record))
+
+                    # Images are already compressed, so store them as they are
+                    info = members[name]
+                    output_info = zipfile.ZipInfo(new_filename, date_time=info.date_time)
+                    output_info.compress_type = zipfile.ZIP_STORED
+                    output_info.file_size = info.file_size
+                    with archive.open(info) as source, output.open(output_info, "w") as target:
+                        while True:
+                            chunk = source.read(COPY_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            target.write(chunk)
+                            yield buffer.drain()
+                    renamer.metrics.observe("write", time.perf_counter() - write_started)
+                    renamer.metrics.increment("images_processed")
+                yield buffer.drain()
+
+            csv_text = io.StringIO(newline='')
+            renamer.write_csv(rows, csv_text)
+            output.writestr(zipfile.ZipInfo(renamer.default_csv_name(len(rows)),
+                                            date_time=datetime.now().timetuple()[:6]),
+                            csv_text.getvalue().encode("utf-8"), compress_type=zipfile.ZIP_DEFLATED)
+        # Closing the output writes the central directory
+        yield buffer.drain()
+    finally:
+        described_batches.close()
+        archive.close()